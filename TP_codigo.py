@@ -1,6 +1,8 @@
 import re
 import json
-from collections import defaultdict
+from compresion import (open_file, replace_json, with_codec_extension,
+                        find_existing_file, codec_for_file)
+from lexicon import Lexicon
 
 # Predefined patterns for tokens
 patterns = {
@@ -13,35 +15,21 @@ patterns = {
 }
 
 # Data dictionary structure
-data_dict = {
-    'TOKEN': [],
-    'PATRON': [],
-    'LEXEMAS': defaultdict(list)
-}
+data_dict = Lexicon()
 
 # Function to initialize the data dictionary with predefined patterns
 def initialize_with_patterns():
     for token, pattern in patterns.items():
-        if token not in data_dict['TOKEN']:
-            data_dict['TOKEN'].append(token)
-            data_dict['PATRON'].append(pattern)
-        lexemes = re.findall(pattern, '', re.IGNORECASE)
-        data_dict['LEXEMAS'][token].extend(lexemes)
+        data_dict.add_token(token, pattern)
+        for lexeme in re.findall(pattern, '', re.IGNORECASE):
+            data_dict.add_lexeme(token, lexeme)
 
 # Function to load the existing data dictionary
 def load_data_dict(file_path):
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
+        with open_file(file_path, 'r') as file:
             loaded_dict = json.load(file)
-            for token in loaded_dict['TOKEN']:
-                if token not in data_dict['TOKEN']:
-                    data_dict['TOKEN'].append(token)
-                    data_dict['PATRON'].append(loaded_dict['PATRON'][loaded_dict['TOKEN'].index(token)])
-                if token not in data_dict['LEXEMAS']:
-                    data_dict['LEXEMAS'][token] = []
-                for lexeme in loaded_dict['LEXEMAS'][token]:
-                    if lexeme not in data_dict['LEXEMAS'][token]:
-                        data_dict['LEXEMAS'][token].append(lexeme)
+            data_dict.load_token_lists(loaded_dict)
             print("Data dictionary loaded successfully.")
             return True
     except FileNotFoundError:
@@ -93,12 +81,11 @@ def tokenize_text(file_path, entry_number):
         found_lexemes.add(lexeme)
         token_found = False
         print(f"Evaluating lexeme: {lexeme}")
-        for token, pattern in zip(data_dict['TOKEN'], data_dict['PATRON']):
+        for token, pattern in zip(data_dict.tokens, data_dict.patterns):
             print(f"Checking pattern for token {token}: {pattern}")
             if re.match(pattern, lexeme, re.IGNORECASE):
                 print(f"Lexeme '{lexeme}' matched with token '{token}'")
-                if lexeme not in data_dict['LEXEMAS'][token]:
-                    data_dict['LEXEMAS'][token].append(lexeme)
+                data_dict.add_lexeme(token, lexeme)
                 output_tokens.append(f'TXT#{entry_number}-{index + 1}: {token}')
                 token_found = True
                 break
@@ -106,31 +93,27 @@ def tokenize_text(file_path, entry_number):
         if not token_found:
             print(f"No match found for lexeme '{lexeme}'")
             new_token = prompt_for_token(lexeme)
-            if new_token not in data_dict['TOKEN']:
-                data_dict['TOKEN'].append(new_token)
-                data_dict['PATRON'].append(rf'\b({lexeme})\b')
+            if data_dict.token_id(new_token) is None:
+                data_dict.add_token(new_token, rf'\b({lexeme})\b')
             else:
                 # Update the pattern to include the new lexeme
-                index = data_dict['TOKEN'].index(new_token)
-                old_pattern = data_dict['PATRON'][index]
+                old_pattern = data_dict.pattern(new_token)
                 new_pattern = old_pattern[:-3] + '|' + lexeme + r')\b'
-                data_dict['PATRON'][index] = new_pattern
-            if lexeme not in data_dict['LEXEMAS'][new_token]:
-                data_dict['LEXEMAS'][new_token].append(lexeme)
+                data_dict.set_pattern(new_token, new_pattern)
+            data_dict.add_lexeme(new_token, lexeme)
             output_tokens.append(f'TXT#{entry_number}-{index + 1}: {new_token}')
             new_lexemes.add(lexeme)
 
     return output_tokens, found_lexemes, new_lexemes
 
 # Function to save data dictionary to a JSON file
-def save_data_dict(file_path):
-    with open(file_path, 'w', encoding='utf-8') as file:
-        json.dump(data_dict, file, ensure_ascii=False, indent=4)
+def save_data_dict(file_path, codec=None):
+    replace_json(data_dict.to_token_lists(with_patterns=True), file_path, codec)
     print("Data dictionary saved successfully.")
 
 # Function to generate the output file for the syntactic analyzer
-def generate_output_file(file_path, output_tokens):
-    with open(file_path, 'w', encoding='utf-8') as file:
+def generate_output_file(file_path, output_tokens, codec=None):
+    with open_file(file_path, 'w', codec) as file:
         for token_info in output_tokens:
             file.write(f"{token_info}\n")
     print("Output file generated successfully.")
@@ -147,35 +130,48 @@ def display_statistics(found_lexemes, new_lexemes):
     print(f"Unprocessed lexemes: {unprocessed_lexemes} ({(unprocessed_lexemes / total_lexemes) * 100:.2f}%)")
     print("----------------------------------------------------")
 
-    for token in data_dict['TOKEN']:
-        print(f"{token}: {len(data_dict['LEXEMAS'][token])} lexemes")
+    for token in data_dict.tokens:
+        print(f"{token}: {data_dict.count(token)} lexemes")
 
-# Main function to execute the tokenizer
-def main():
-    input_file = 'input.txt'  # Replace with the path to your input file
-    data_dict_file = 'data_dict.json'
-    output_file = 'output.txt'
-    print("**----------------------------------------------------**")
-    print("Inicio del programa")
-    print("**----------------------------------------------------**")
-    
-    use_predefined_patterns = input("Do you want to use predefined patterns? (yes/no): ").strip().lower() == 'yes'
+# Function to ask the user whether to use the predefined patterns
+def prompt_for_predefined():
+    return input("Do you want to use predefined patterns? (yes/no): ").strip().lower() == 'yes'
+
+# Function to initialize with the predefined patterns if wanted and load the existing data dictionary
+def prepare_data_dict(data_dict_file):
+    use_predefined_patterns = prompt_for_predefined()
     
     if use_predefined_patterns:
         initialize_with_patterns()
         print("Initialized data dictionary with predefined patterns.")
     
-    if load_data_dict(data_dict_file):
+    if load_data_dict(find_existing_file(data_dict_file)):
         print("Loaded existing data dictionary.")
     else:
         print("No existing data dictionary found. Starting with a new one.")
 
-    entry_number = 1  # This should be incremented for each new file processed
-
+# Function to tokenize one input file and save its output and the data dictionary
+def process_input_file(input_file, entry_number, data_dict_file, output_file, codec=None):
     output_tokens, found_lexemes, new_lexemes = tokenize_text(input_file, entry_number)
-    save_data_dict(data_dict_file)
-    generate_output_file(output_file, output_tokens)
+    save_data_dict(data_dict_file, codec)
+    generate_output_file(output_file, output_tokens, codec)
     display_statistics(found_lexemes, new_lexemes)
 
+# Main function to execute the tokenizer
+def main():
+    input_file = 'input.txt'  # Replace with the path to your input file
+    codec = codec_for_file('data_dict.json')  # --codec=gzip, lzma or zstd; otherwise the one data_dict.json was saved with
+    data_dict_file = with_codec_extension('data_dict.json', codec)
+    output_file = with_codec_extension('output.txt', codec)
+    print("**----------------------------------------------------**")
+    print("Inicio del programa")
+    print("**----------------------------------------------------**")
+    
+    prepare_data_dict(data_dict_file)
+
+    entry_number = 1  # This should be incremented for each new file processed
+
+    process_input_file(input_file, entry_number, data_dict_file, output_file, codec)
+
 if __name__ == "__main__":
     main()
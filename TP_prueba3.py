@@ -1,10 +1,18 @@
+import os
 import re
+import sys
 import json
-from collections import defaultdict
+import signal
+import asyncio
+from compresion import (open_file, dump_json, replace_json,
+                        with_codec_extension, find_existing_file,
+                        codec_for_file, strip_codec_option)
+from lexicon import Lexicon
+from indice import updated_index, save_index
 
 # Estructura del diccionario de datos
 data_dict = {
-    'POSICIONES': defaultdict(lambda: defaultdict(list)),
+    'POSICIONES': Lexicon(),
     'num_files_processed': 0,  # Número de archivos procesados
     'predefined_lexemes_used':
     False  # Si se han utilizado los lexemas predefinidos
@@ -27,27 +35,22 @@ predefined_lexemes = {
 def initialize_with_lexemes():
     for token, lexemes in predefined_lexemes.items():
         for lexeme in lexemes:
-            data_dict['POSICIONES'][token][lexeme.lower()] = []
+            data_dict['POSICIONES'].add_lexeme(token, lexeme.lower())
     data_dict['predefined_lexemes_used'] = True
 
 
 # Función para cargar el diccionario de datos existente
 def load_data_dict(file_path):
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
+        with open_file(file_path, 'r') as file:
             loaded_dict = json.load(file)
+            # Convertir las posiciones cargadas a la estructura del léxico
+            if 'POSICIONES' in loaded_dict:
+                lexicon = Lexicon()
+                lexicon.load_positions(loaded_dict['POSICIONES'],
+                                       lowercase=True)
+                loaded_dict['POSICIONES'] = lexicon
             data_dict.update(loaded_dict)
-            # Convertir la estructura del diccionario cargado a defaultdict
-            data_dict['POSICIONES'] = defaultdict(
-                lambda: defaultdict(list), {
-                    token:
-                    defaultdict(
-                        list, {
-                            lexeme.lower(): positions
-                            for lexeme, positions in lexemes.items()
-                        })
-                    for token, lexemes in data_dict['POSICIONES'].items()
-                })
             print("Diccionario de datos cargado exitosamente.")
             return True
     except FileNotFoundError:
@@ -84,11 +87,19 @@ def prompt_for_token(lexeme):
             print("Entrada no válida, por favor ingrese un número.")
 
 
+# Función para leer el texto de entrada
+def read_input_file(file_path):
+    with open(file_path, 'r', encoding='utf-8') as file:
+        return file.read()
+
+
 # Función para leer y tokenizar el texto de entrada
 def tokenize_text(file_path, entry_number):
-    with open(file_path, 'r', encoding='utf-8') as file:
-        text = file.read()
+    return tokenize_string(read_input_file(file_path), entry_number)
 
+
+# Función para tokenizar un texto ya leído
+def tokenize_string(text, entry_number):
     lexemes = re.split(r'\s+|(?<!\d)[.,;:!?](?!\d)', text)
     found_lexemes = set()
     new_lexemes = set()
@@ -103,21 +114,17 @@ def tokenize_text(file_path, entry_number):
         found_lexemes.add(lexeme)
         token_found = False
 
-        for token in data_dict['POSICIONES']:
-            if lexeme in data_dict['POSICIONES'][token]:
-                data_dict['POSICIONES'][token][lexeme].append(
-                    f'TXT{entry_number}-{posicion}')
-                token_found = True
-                break
+        found = data_dict['POSICIONES'].lookup(lexeme)
+        if found is not None:
+            found.add_occurrence(entry_number, posicion)
+            token_found = True
 
         if not token_found:
             new_token = prompt_for_token(lexeme)
             if new_token == 'ERROR_LX':
                 print(f"Lexema '{lexeme}' identificado como error léxico.")
-            if new_token not in data_dict['POSICIONES']:
-                data_dict['POSICIONES'][new_token] = defaultdict(list)
-            data_dict['POSICIONES'][new_token][lexeme].append(
-                f'TXT{entry_number}-{posicion}')
+            data_dict['POSICIONES'].add_lexeme(
+                new_token, lexeme).add_occurrence(entry_number, posicion)
             new_lexemes.add(lexeme)
 
         posicion += 1
@@ -126,27 +133,20 @@ def tokenize_text(file_path, entry_number):
 
 
 # Función para guardar el diccionario de datos en un archivo JSON
-def save_data_dict(file_path):
-    with open(file_path, 'w', encoding='utf-8') as file:
-        json.dump(data_dict, file, ensure_ascii=False, indent=4)
+def save_data_dict(file_path, codec=None):
+    replace_json(snapshot_data_dict(), file_path, codec)
     print("Diccionario de datos guardado exitosamente.")
 
 
+# Función para obtener los lexemas y posiciones de una entrada
+def build_output_data(entry_number):
+    return data_dict['POSICIONES'].to_positions(entry_number)
+
+
 # Función para generar el archivo de salida para el analizador sintáctico
-def generate_output_file(file_path, entry_number):
-    output_data = {
-        token: {
-            lexeme: [
-                pos for pos in positions
-                if pos.startswith(f'TXT{entry_number}-')
-            ]
-            for lexeme, positions in lexemes.items() if any(
-                pos.startswith(f'TXT{entry_number}-') for pos in positions)
-        }
-        for token, lexemes in data_dict['POSICIONES'].items()
-    }
-    with open(file_path, 'w', encoding='utf-8') as file:
-        json.dump(output_data, file, ensure_ascii=False, indent=4)
+def generate_output_file(file_path, entry_number, codec=None):
+    output_data = build_output_data(entry_number)
+    dump_json(output_data, file_path, codec)
     print("Archivo de salida generado exitosamente.")
 
 
@@ -159,15 +159,16 @@ def display_statistics(found_lexemes, new_lexemes, prev_lexemes_count,
 
     print("\n----------------------------------------------------")
     print(f"Total de lexemas en el texto actual: {total_lexemes}")
-    print(
-        f"Lexemas procesados: {processed_lexemes} ({(processed_lexemes / total_lexemes) * 100:.2f}%)"
-    )
-    print(
-        f"Lexemas no procesados: {unprocessed_lexemes} ({(unprocessed_lexemes / total_lexemes) * 100:.2f}%)"
-    )
+    if total_lexemes:
+        print(
+            f"Lexemas procesados: {processed_lexemes} ({(processed_lexemes / total_lexemes) * 100:.2f}%)"
+        )
+        print(
+            f"Lexemas no procesados: {unprocessed_lexemes} ({(unprocessed_lexemes / total_lexemes) * 100:.2f}%)"
+        )
     print("----------------------------------------------------")
 
-    for token in data_dict['POSICIONES']:
+    for token in data_dict['POSICIONES'].tokens:
         print(f"\n{token}:")
         print(
             f"  Lexemas antes del procesamiento: {prev_lexemes_count.get(token, 0)}"
@@ -175,14 +176,40 @@ def display_statistics(found_lexemes, new_lexemes, prev_lexemes_count,
         print(
             f"  Lexemas añadidos en este archivo: {new_lexemes_count.get(token, 0)}"
         )
-        print(f"  Total de lexemas: {len(data_dict['POSICIONES'][token])}")
+        print(f"  Total de lexemas: {data_dict['POSICIONES'].count(token)}")
 
 
-# Función principal para ejecutar el tokenizador
-def main():
-    data_dict_file = 'data_dict.json'
+# Función para copiar el diccionario de datos en el formato del JSON, de modo
+# que pueda guardarse mientras se sigue tokenizando. Con last_entry se copia
+# tal como estaba al terminar esa entrada, con la cantidad de lexemas por
+# token que indica lexeme_counts
+def snapshot_data_dict(last_entry=None, lexeme_counts=None):
+    snapshot = dict(data_dict)
+    if last_entry is None:
+        snapshot['POSICIONES'] = data_dict['POSICIONES'].to_positions()
+    else:
+        snapshot['num_files_processed'] = last_entry
+        snapshot['POSICIONES'] = data_dict['POSICIONES'].to_positions_until(
+            last_entry, lexeme_counts)
+    return snapshot
+
+
+# Función para contar la cantidad de lexemas de cada token
+def count_lexemes():
+    lexicon = data_dict['POSICIONES']
+    return {token: lexicon.count(token) for token in lexicon.tokens}
+
 
-    if load_data_dict(data_dict_file):
+# Función para preguntar al usuario si desea usar los lexemas predefinidos
+def prompt_for_predefined():
+    return input("¿Desea usar lexemas predefinidos? (sí/no): ").strip().lower(
+    ) == 'sí'
+
+
+# Función para cargar el diccionario de datos y, en la primera iteración,
+# ofrecer los lexemas predefinidos
+def prepare_data_dict(data_dict_file):
+    if load_data_dict(find_existing_file(data_dict_file)):
         print("Diccionario de datos cargado exitosamente.")
     else:
         print(
@@ -191,10 +218,7 @@ def main():
 
     if data_dict['num_files_processed'] == 0 and not data_dict[
             'predefined_lexemes_used']:
-        use_predefined_patterns = input(
-            "¿Desea usar lexemas predefinidos? (sí/no): ").strip().lower(
-            ) == 'sí'
-        if use_predefined_patterns:
+        if prompt_for_predefined():
             initialize_with_lexemes()
             print(
                 "Diccionario de datos inicializado con lexemas predefinidos.")
@@ -203,37 +227,217 @@ def main():
             "Los lexemas predefinidos ya han sido utilizados o no es la primera iteración. Omitiendo inicialización."
         )
 
+
+# Función principal para ejecutar el tokenizador
+def main():
+    codec = codec_for_file('data_dict.json')  # --codec=gzip, lzma o zstd; si no, el del data_dict.json guardado
+    data_dict_file = with_codec_extension('data_dict.json', codec)
+
+    prepare_data_dict(data_dict_file)
+
     input_file = input("Ingrese la ruta del archivo de entrada: ").strip(
     )  # Obtener la ruta del archivo de entrada del usuario
+    process_input_file(input_file, data_dict_file, codec)
+
+
+# Función para procesar un archivo de entrada: tokenizarlo, generar su
+# salida, guardar el diccionario y actualizar el índice
+def process_input_file(input_file, data_dict_file, codec=None):
     entry_number = data_dict[
         'num_files_processed'] + 1  # Incrementar el número de entrada basado en los archivos procesados
-    output_file = f'output{entry_number}.txt'  # Nombre del archivo de salida basado en el número de entrada
+    output_file = with_codec_extension(f'output{entry_number}.txt', codec)  # Nombre del archivo de salida basado en el número de entrada
 
     # Contar la cantidad de lexemas antes del procesamiento
-    prev_lexemes_count = {
-        token: len(lexemes)
-        for token, lexemes in data_dict['POSICIONES'].items()
-    }
+    prev_lexemes_count = count_lexemes()
 
     found_lexemes, new_lexemes = tokenize_text(input_file, entry_number)
 
     # Contar la cantidad de lexemas después del procesamiento
     new_lexemes_count = {
-        token:
-        len(data_dict['POSICIONES'][token]) - prev_lexemes_count.get(token, 0)
-        for token in data_dict['POSICIONES']
+        token: count - prev_lexemes_count.get(token, 0)
+        for token, count in count_lexemes().items()
     }
 
-    save_data_dict(data_dict_file)
-    generate_output_file(output_file, entry_number)
+    save_data_dict(data_dict_file, codec)
+    generate_output_file(output_file, entry_number, codec)
     display_statistics(found_lexemes, new_lexemes, prev_lexemes_count,
                        new_lexemes_count)
 
     data_dict[
         'num_files_processed'] = entry_number  # Actualizar el número de archivos procesados
     save_data_dict(
-        data_dict_file)  # Guardar el diccionario de datos actualizado
+        data_dict_file, codec)  # Guardar el diccionario de datos actualizado
+
+    # Agregar la entrada al índice posicional
+    index_file = with_codec_extension('indice.json', codec)
+    save_index(
+        updated_index(index_file, data_dict['POSICIONES'], entry_number),
+        index_file, codec)
+    return entry_number
+
+
+
+# Etapa de lectura: lee los archivos en orden y les asigna el número de
+# entrada; un archivo que no se puede leer se omite sin consumir número.
+# Deja de leer si se activa stop (Ctrl-C durante la tokenización)
+async def read_stage(input_files, first_entry_number, read_queue, stop):
+    entry_number = first_entry_number
+    for input_file in input_files:
+        if stop.is_set():
+            break
+        try:
+            text = await asyncio.to_thread(read_input_file, input_file)
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"No se pudo leer '{input_file}', se omite: {e}")
+            continue
+        await read_queue.put((entry_number, text))
+        entry_number += 1
+    await read_queue.put(None)
+
+
+# Función para tokenizar en el hilo principal con el manejador de Ctrl-C por
+# defecto: asyncio.run lo reemplaza por uno que solo cancela la tarea
+# principal, algo que input() no advierte mientras espera una respuesta
+def tokenize_interruptible(text, entry_number):
+    handler = signal.signal(signal.SIGINT, signal.default_int_handler)
+    try:
+        return tokenize_string(text, entry_number)
+    finally:
+        signal.signal(signal.SIGINT, handler)
+
+
+# Etapa de tokenización: es la única que modifica el diccionario de datos,
+# y entrega a la etapa de escritura la salida de cada entrada junto con la
+# cantidad de lexemas por token al terminarla.
+# Tokeniza en el hilo principal, porque prompt_for_token usa input(); solo
+# las lecturas y escrituras van a otros hilos. Devuelve True si se
+# interrumpió con Ctrl-C
+async def tokenize_stage(read_queue, write_queue, index, stop):
+    interrupted = False
+    while (item := await read_queue.get()) is not None:
+        entry_number, text = item
+        prev_lexemes_count = count_lexemes()
+
+        try:
+            found_lexemes, new_lexemes = tokenize_interruptible(
+                text, entry_number)
+        except KeyboardInterrupt:
+            # La entrada a medias no se guarda: num_files_processed no
+            # avanzó y la escritura solo guarda copias de entradas
+            # completas. Se espera a que la lectura se detenga
+            print(f"\nInterrumpido durante la entrada {entry_number}.")
+            stop.set()
+            while await read_queue.get() is not None:
+                pass
+            interrupted = True
+            break
+
+        lexeme_counts = count_lexemes()
+        new_lexemes_count = {
+            token: count - prev_lexemes_count.get(token, 0)
+            for token, count in lexeme_counts.items()
+        }
+        display_statistics(found_lexemes, new_lexemes, prev_lexemes_count,
+                           new_lexemes_count)
+
+        data_dict['num_files_processed'] = entry_number
+        index.update(data_dict['POSICIONES'])
+        await write_queue.put(
+            (entry_number, build_output_data(entry_number), lexeme_counts))
+    await write_queue.put(None)
+    return interrupted
+
+
+# Etapa de escritura: guarda la salida de cada entrada y, cuando no hay otra
+# en cola, el diccionario y el índice (completos, no por diferencias). Las
+# copias para guardarlos se hacen recién entonces y no por cada archivo, ya
+# que copiar el diccionario entero en cada entrada volvería cuadrático el
+# procesamiento de muchos archivos
+async def write_stage(write_queue, data_dict_file, index_file, index, codec):
+    unsaved = None  # Última entrada escrita cuyo diccionario falta guardar
+
+    # Función para copiar el diccionario y el índice tal como estaban al
+    # terminar una entrada; si el índice ya va más adelante no se copia, y
+    # se pondrá al día desde el diccionario al cargarlo
+    def copy_data(entry_number, lexeme_counts):
+        index_data = None
+        if index.last_entry <= entry_number:
+            index_data = index.to_json()
+        return snapshot_data_dict(entry_number, lexeme_counts), index_data
+
+    # Función para guardar las copias del diccionario y del índice
+    def save_copies(copies):
+        data_dict_copy, index_copy = copies
+        replace_json(data_dict_copy, data_dict_file, codec)
+        if index_copy is not None:
+            replace_json(index_copy, index_file, codec, compact=True)
+
+    try:
+        while (item := await write_queue.get()) is not None:
+            entry_number, output_data, lexeme_counts = item
+            output_file = with_codec_extension(f'output{entry_number}.txt',
+                                               codec)
+            await asyncio.to_thread(dump_json, output_data, output_file,
+                                    codec)
+            unsaved = entry_number, lexeme_counts
+            # Si ya hay otra entrada en cola, se guardará junto con ella. La
+            # copia se hace en el hilo principal, entre entradas, y luego se
+            # guarda en otro hilo mientras se sigue tokenizando
+            if write_queue.empty():
+                copies = copy_data(*unsaved)
+                unsaved = None
+                await asyncio.to_thread(save_copies, copies)
+    finally:
+        # Toda salida escrita debe quedar con su diccionario guardado, también
+        # si otra etapa falló y asyncio.run canceló esta
+        if unsaved is not None:
+            save_copies(copy_data(*unsaved))
+
+
+# Función para procesar varios archivos solapando lectura, tokenización y
+# escritura; las colas acotadas evitan que la lectura se adelante demasiado.
+# Devuelve True si se interrumpió con Ctrl-C
+async def run_pipeline(input_files, data_dict_file, codec=None, queue_size=2):
+    index_file = with_codec_extension('indice.json', codec)
+    index = updated_index(index_file, data_dict['POSICIONES'],
+                          data_dict['num_files_processed'])
+    read_queue = asyncio.Queue(maxsize=queue_size)
+    write_queue = asyncio.Queue(maxsize=queue_size)
+    stop = asyncio.Event()
+    first_entry_number = data_dict['num_files_processed'] + 1
+    _, interrupted, _ = await asyncio.gather(
+        read_stage(input_files, first_entry_number, read_queue, stop),
+        tokenize_stage(read_queue, write_queue, index, stop),
+        write_stage(write_queue, data_dict_file, index_file, index, codec))
+    if not interrupted:
+        print(
+            "Archivos de salida y diccionario de datos guardados exitosamente.")
+    return interrupted
+
+
+# Función principal para procesar varios archivos en modo pipeline
+def main_pipeline(input_files):
+    codec = codec_for_file('data_dict.json')  # --codec=gzip, lzma o zstd; si no, el del data_dict.json guardado
+    data_dict_file = with_codec_extension('data_dict.json', codec)
+
+    # Verificar las rutas antes de empezar a preguntar por lexemas
+    missing_files = [
+        input_file for input_file in input_files
+        if not os.path.isfile(input_file)
+    ]
+    if missing_files:
+        print(f"Archivos de entrada no encontrados: {', '.join(missing_files)}")
+        return
+
+    prepare_data_dict(data_dict_file)
+    if asyncio.run(run_pipeline(input_files, data_dict_file, codec)):
+        raise KeyboardInterrupt
 
 
 if __name__ == "__main__":
-    main()
+    # Con rutas como argumentos se procesan todas en modo pipeline
+    input_files = strip_codec_option(sys.argv[1:])
+    if input_files:
+        main_pipeline(input_files)
+    else:
+        main()
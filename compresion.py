@@ -0,0 +1,203 @@
+import io
+import os
+import sys
+import gzip
+import lzma
+import json
+
+try:
+    import zstandard  # Opcional: pip install zstandard
+except ImportError:
+    zstandard = None
+
+
+# Función para abrir un archivo zstd en modo binario
+def _open_zstd(file_path, mode):
+    if zstandard is None:
+        raise RuntimeError("El codec 'zstd' requiere el paquete 'zstandard'.")
+    return zstandard.open(file_path, mode)
+
+
+# Codecs disponibles: nombre -> función que abre el archivo en modo binario
+codecs = {
+    'gzip': lambda file_path, mode: gzip.open(file_path, mode),
+    'lzma': lambda file_path, mode: lzma.open(file_path, mode),
+    'zstd': _open_zstd
+}
+
+# Extensión de archivo asociada a cada codec
+extensions = {
+    '.gz': 'gzip',
+    '.xz': 'lzma',
+    '.lzma': 'lzma',
+    '.zst': 'zstd'
+}
+
+# Bytes iniciales (número mágico) de cada formato comprimido
+magic_numbers = {
+    b'\x1f\x8b': 'gzip',
+    b'\xfd7zXZ\x00': 'lzma',
+    b'\x28\xb5\x2f\xfd': 'zstd'
+}
+
+
+# Función para registrar un nuevo codec
+def register_codec(name, opener, extension=None, magic=None):
+    codecs[name] = opener
+    if extension:
+        extensions[extension] = name
+    if magic:
+        magic_numbers[magic] = name
+
+
+# Función para obtener el codec a partir de la extensión del archivo
+def codec_from_extension(file_path):
+    for extension, name in extensions.items():
+        if file_path.endswith(extension):
+            return name
+    return None
+
+
+# Función para añadir la extensión del codec al nombre del archivo
+def with_codec_extension(file_path, codec):
+    if codec is None or codec_from_extension(file_path) == codec:
+        return file_path
+    for extension, name in extensions.items():
+        if name == codec:
+            return file_path + extension
+    return file_path
+
+
+# Función para quitar la extensión del codec del nombre del archivo
+def without_codec_extension(file_path):
+    for extension in extensions:
+        if file_path.endswith(extension):
+            return file_path[:-len(extension)]
+    return file_path
+
+
+# Función para obtener las versiones existentes de un archivo: la original
+# sin comprimir y la comprimida con cada codec
+def existing_versions(file_path):
+    plain_path = without_codec_extension(file_path)
+    return [
+        path for path in [plain_path] + [plain_path + extension
+                                         for extension in extensions]
+        if os.path.exists(path)
+    ]
+
+
+# Función para elegir qué archivo leer: la versión que exista, con o sin
+# comprimir, de modo que al cambiar de codec se cargue el archivo anterior
+# (por ejemplo data_dict.json), que desde entonces se guardará con el codec
+# elegido. Si existen varias versiones no se sabe cuál es la vigente y se
+# detiene el programa antes de usar una vieja
+def find_existing_file(file_path):
+    versions = existing_versions(file_path)
+    if len(versions) > 1:
+        raise SystemExit(
+            f"Hay varias versiones de {without_codec_extension(file_path)}: "
+            f"{', '.join(versions)}. Deje solo la vigente.")
+    if versions:
+        return versions[0]
+    return file_path
+
+
+# Opción de línea de comandos para elegir el codec, por ejemplo --codec=gzip;
+# sin ella el codec se deduce de la extensión de cada archivo
+CODEC_OPTION = '--codec='
+
+
+# Función para verificar que un codec se pueda usar, antes de preguntar
+# nada al usuario y no recién al guardar
+def check_codec(codec):
+    if codec is None:
+        return
+    if codec not in codecs:
+        raise SystemExit(f"Codec desconocido: {codec}. "
+                         f"Opciones: {', '.join(codecs)}")
+    if codec == 'zstd' and zstandard is None:
+        raise SystemExit("El codec 'zstd' requiere el paquete 'zstandard' "
+                         "(pip install zstandard).")
+
+
+# Función para leer el codec elegido en la línea de comandos
+def codec_option(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    codec = None
+    for arg in argv:
+        if arg.startswith(CODEC_OPTION):
+            codec = arg[len(CODEC_OPTION):]
+            check_codec(codec)
+    return codec
+
+
+# Función para obtener el codec con que se guarda un archivo: el de la
+# opción --codec o, sin ella, el de la versión que ya existe del archivo
+def codec_for_file(file_path, argv=None):
+    codec = codec_option(argv)
+    if codec is None:
+        codec = codec_from_extension(find_existing_file(file_path))
+        check_codec(codec)
+    return codec
+
+
+# Función para quitar la opción del codec de los argumentos
+def strip_codec_option(argv):
+    return [arg for arg in argv if not arg.startswith(CODEC_OPTION)]
+
+
+# Función para detectar el codec leyendo los primeros bytes del archivo
+def _detect_codec(file_path):
+    with open(file_path, 'rb') as file:
+        header = file.read(8)
+    for magic, name in magic_numbers.items():
+        if header.startswith(magic):
+            return name
+    return None
+
+
+# Función para abrir un archivo de texto, comprimido o no.
+# Al leer se detecta el formato por su contenido, de modo que los archivos
+# .json existentes siguen siendo legibles; al escribir se usa el codec
+# indicado o, si no se indica, el que corresponde a la extensión.
+def open_file(file_path, mode='r', codec=None):
+    if 'r' in mode:
+        codec = _detect_codec(file_path)
+    elif codec is None:
+        codec = codec_from_extension(file_path)
+    if codec is None:
+        return open(file_path, mode, encoding='utf-8')
+    if codec not in codecs:
+        raise ValueError(f"Codec desconocido: {codec}")
+    binary_mode = mode.replace('t', '').replace('b', '') + 'b'
+    return io.TextIOWrapper(codecs[codec](file_path, binary_mode),
+                            encoding='utf-8')
+
+
+# Función para cargar un JSON, comprimido o no. json.load lee todo el texto
+# antes de analizarlo, así que el archivo se descomprime entero en memoria
+def load_json(file_path):
+    with open_file(file_path, 'r') as file:
+        return json.load(file)
+
+
+# Función para guardar un JSON; comprimido, o con compact, se omite la
+# indentación, que solo ocupa espacio
+def dump_json(data, file_path, codec=None, compact=False):
+    with open_file(file_path, 'w', codec) as file:
+        if (not compact and codec is None
+                and codec_from_extension(file_path) is None):
+            json.dump(data, file, ensure_ascii=False, indent=4)
+        else:
+            json.dump(data, file, ensure_ascii=False, separators=(',', ':'))
+
+
+# Función para guardar un JSON que reemplaza a sus otras versiones: una vez
+# guardado se borran, por ejemplo, el data_dict.json sin comprimir ya
+# migrado a data_dict.json.gz, para que ninguna ejecución posterior lo cargue
+def replace_json(data, file_path, codec=None, compact=False):
+    dump_json(data, file_path, codec, compact)
+    for path in existing_versions(file_path):
+        if path != file_path:
+            os.remove(path)
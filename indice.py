@@ -0,0 +1,349 @@
+import os
+import math
+from array import array
+from bisect import bisect_right
+from collections import Counter
+
+from compresion import (load_json, replace_json, find_existing_file,
+                        with_codec_extension, codec_for_file)
+from lexicon import Lexicon
+
+# Cada aparición se guarda como un único entero: número de entrada en los
+# bits altos y posición en los bajos, de modo que el orden de las claves es
+# el orden (entrada, posición) y la posición siguiente es clave + 1
+POSITION_BITS = 32
+
+
+# Función para combinar número de entrada y posición en una clave
+def make_key(entry_number, position):
+    return (entry_number << POSITION_BITS) | position
+
+
+# Función para separar una clave en número de entrada y posición
+def split_key(key):
+    return key >> POSITION_BITS, key & ((1 << POSITION_BITS) - 1)
+
+
+# Lista ordenada de apariciones con punteros de salto implícitos cada
+# raíz de n elementos, usados para avanzar rápido durante las intersecciones
+class PostingList:
+    __slots__ = ('keys', '_step')
+
+    def __init__(self, keys=None):
+        self.keys = keys if keys is not None else array('Q')
+        self._step = None
+
+    # Función para agregar una clave (deben llegar en orden creciente)
+    def append(self, key):
+        if self.keys and key <= self.keys[-1]:
+            raise ValueError("Las apariciones deben agregarse en orden.")
+        self.keys.append(key)
+        self._step = None
+
+    # Función para obtener la distancia entre punteros de salto
+    def skip_step(self):
+        if self._step is None:
+            self._step = max(1, math.isqrt(len(self.keys)))
+        return self._step
+
+    # Función para avanzar desde el índice i hasta la primera clave >= target
+    def advance(self, i, target):
+        keys = self.keys
+        step = self.skip_step()
+        n = len(keys)
+        while i < n and keys[i] < target:
+            if i % step == 0 and i + step < n and keys[i + step] <= target:
+                i += step
+            else:
+                i += 1
+        return i
+
+    # Función para obtener las apariciones en el formato 'TXTn-pos'
+    def occurrences(self):
+        return [f'TXT{entry}-{position}'
+                for entry, position in map(split_key, self.keys)]
+
+    # Función para contar las apariciones por número de entrada
+    def entry_counts(self):
+        return Counter(key >> POSITION_BITS for key in self.keys)
+
+    def __len__(self):
+        return len(self.keys)
+
+
+# Función para intersectar dos listas por mezcla: devuelve las claves k de
+# first tales que k + offset está en second
+def intersect(first, second, offset=0):
+    result = array('Q')
+    i = j = 0
+    while i < len(first) and j < len(second):
+        shifted = first.keys[i] + offset
+        key = second.keys[j]
+        if shifted == key:
+            result.append(first.keys[i])
+            i += 1
+            j += 1
+        elif shifted < key:
+            i = first.advance(i, key - offset)
+        else:
+            j = second.advance(j, shifted)
+    return PostingList(result)
+
+
+# Índice posicional del corpus: listas de apariciones por lexema y por
+# token, y conteo de n-gramas, actualizado entrada por entrada
+class PositionalIndex:
+    __slots__ = ('max_n', 'last_entry', 'lexeme_postings', 'token_postings',
+                 'lexeme_ngrams', 'token_ngrams')
+
+    def __init__(self, max_n=3):
+        self.max_n = max_n  # Mayor n-grama contado (trigramas por defecto)
+        self.last_entry = 0  # Último número de entrada indexado
+        self.lexeme_postings = {}
+        self.token_postings = {}
+        # Conteo de n-gramas por cada n, de 2 a max_n
+        self.lexeme_ngrams = {n: Counter() for n in range(2, max_n + 1)}
+        self.token_ngrams = {n: Counter() for n in range(2, max_n + 1)}
+
+    # Función para indexar una entrada a partir de su secuencia de
+    # (posición, lexema, token) ordenada por posición
+    def add_entry(self, entry_number, sequence):
+        if entry_number <= self.last_entry:
+            raise ValueError(f"La entrada {entry_number} ya fue indexada.")
+        for position, lexeme, token in sequence:
+            key = make_key(entry_number, position)
+            self.lexeme_postings.setdefault(lexeme, PostingList()).append(key)
+            self.token_postings.setdefault(token, PostingList()).append(key)
+
+        # Contar los n-gramas de posiciones consecutivas
+        for start in range(len(sequence)):
+            for n in range(2, self.max_n + 1):
+                window = sequence[start:start + n]
+                if len(window) < n or window[-1][0] - window[0][0] != n - 1:
+                    break
+                self.lexeme_ngrams[n][tuple(item[1] for item in window)] += 1
+                self.token_ngrams[n][tuple(item[2] for item in window)] += 1
+        self.last_entry = entry_number
+
+    # Función para construir las listas de apariciones de las entradas hasta
+    # last_entry a partir del léxico; no se
+    # guardan en indice.json para no duplicar el diccionario de datos
+    def load_postings(self, lexicon, last_entry):
+        lexeme_keys = {}
+        token_keys = {}
+        for lexeme in lexicon:
+            end = bisect_right(lexeme.entries, last_entry)
+            if not end:
+                continue
+            keys = [
+                make_key(lexeme.entries[index], lexeme.positions[index])
+                for index in range(end)
+            ]
+            lexeme_keys.setdefault(lexeme.text, []).extend(keys)
+            token_keys.setdefault(lexicon.tokens[lexeme.token_id],
+                                  []).extend(keys)
+        # Un mismo texto o token junta apariciones de varios lexemas
+        self.lexeme_postings = {
+            lexeme: PostingList(array('Q', sorted(keys)))
+            for lexeme, keys in lexeme_keys.items()
+        }
+        self.token_postings = {
+            token: PostingList(array('Q', sorted(keys)))
+            for token, keys in token_keys.items()
+        }
+        self.last_entry = last_entry
+
+    # Función para indexar las entradas del léxico que aún no lo estén; solo
+    # recorre las apariciones posteriores a la última entrada indexada
+    def update(self, lexicon):
+        new_entries = {}
+        for lexeme in lexicon:
+            token = lexicon.tokens[lexeme.token_id]
+            start = bisect_right(lexeme.entries, self.last_entry)
+            for index in range(start, len(lexeme.entries)):
+                new_entries.setdefault(lexeme.entries[index], []).append(
+                    (lexeme.positions[index], lexeme.text, token))
+        for entry_number in sorted(new_entries):
+            self.add_entry(entry_number, sorted(new_entries[entry_number]))
+
+    # Función para obtener la lista de apariciones de un lexema o token
+    def postings(self, item, kind='lexeme'):
+        postings = (self.lexeme_postings
+                    if kind == 'lexeme' else self.token_postings)
+        return postings.get(item, PostingList())
+
+    # Función para obtener las posiciones donde comienza una secuencia de
+    # lexemas o tokens consecutivos
+    def sequence_postings(self, items, kind='lexeme'):
+        if not items:
+            return PostingList()
+        result = self.postings(items[0], kind)
+        for offset, item in enumerate(items[1:], 1):
+            if not result:
+                break
+            result = intersect(result, self.postings(item, kind), offset)
+        return result
+
+    # Función para obtener todas las apariciones de un lexema
+    def lexeme_occurrences(self, lexeme):
+        return self.postings(lexeme).occurrences()
+
+    # Función para obtener dónde comienza cada aparición de una secuencia
+    def sequence_occurrences(self, items, kind='lexeme'):
+        return self.sequence_postings(items, kind).occurrences()
+
+    # Función para contar las apariciones de una secuencia en cada entrada
+    def sequence_frequencies(self, items, kind='lexeme'):
+        return self.sequence_postings(items, kind).entry_counts()
+
+    # Función para obtener los n-gramas más frecuentes de tamaño n
+    def most_common_ngrams(self, n, kind='lexeme', limit=None):
+        ngrams = self.lexeme_ngrams if kind == 'lexeme' else self.token_ngrams
+        if n not in ngrams:
+            raise ValueError(f"Solo se cuentan n-gramas de 2 a {self.max_n}.")
+        return ngrams[n].most_common(limit)
+
+    # Función para obtener cuántas veces aparece un n-grama ya contado
+    def ngram_count(self, items, kind='lexeme'):
+        ngrams = self.lexeme_ngrams if kind == 'lexeme' else self.token_ngrams
+        if len(items) in ngrams:
+            return ngrams[len(items)][tuple(items)]
+        return len(self.sequence_postings(items, kind))
+
+    # Función para contar los pares de apariciones de first y second en la
+    # misma entrada a una distancia de a lo sumo window posiciones, en
+    # cualquier orden. Cada par se cuenta una vez, también cuando first y
+    # second son el mismo lexema o token
+    def cooccurrence_count(self, first, second, window=5, kind='lexeme'):
+        same = first == second
+        first_keys = self.postings(first, kind).keys
+        second_keys = self.postings(second, kind).keys
+        count = 0
+        start = 0
+        for key in first_keys:
+            entry = key >> POSITION_BITS
+            # Ventana deslizante sobre second: ambas listas están ordenadas
+            while (start < len(second_keys)
+                   and second_keys[start] < key - window):
+                start += 1
+            index = start
+            while (index < len(second_keys)
+                   and second_keys[index] <= key + window):
+                other = second_keys[index]
+                if (other >> POSITION_BITS == entry and other != key
+                        and not (same and other < key)):
+                    count += 1
+                index += 1
+        return count
+
+
+    # Función para convertir el índice a un diccionario guardable en JSON;
+    # solo se guardan los conteos de n-gramas, que no se pueden obtener del
+    # diccionario de datos sin recorrerlo entero
+    def to_json(self):
+        return {
+            'last_entry': self.last_entry,
+            'max_n': self.max_n,
+            'ngramas_lexemas': {
+                str(n): [[*ngram, count] for ngram, count in counts.items()]
+                for n, counts in self.lexeme_ngrams.items()
+            },
+            'ngramas_tokens': {
+                str(n): [[*ngram, count] for ngram, count in counts.items()]
+                for n, counts in self.token_ngrams.items()
+            }
+        }
+
+    # Función para reconstruir el índice desde su diccionario JSON y el
+    # léxico ya cargado, del que se toman las listas de apariciones
+    @classmethod
+    def from_json(cls, loaded_dict, lexicon):
+        index = cls(loaded_dict['max_n'])
+        for ngrams, name in ((index.lexeme_ngrams, 'ngramas_lexemas'),
+                             (index.token_ngrams, 'ngramas_tokens')):
+            for n, items in loaded_dict[name].items():
+                ngrams[int(n)] = Counter(
+                    {tuple(item[:-1]): item[-1]
+                     for item in items})
+        index.load_postings(lexicon, loaded_dict['last_entry'])
+        return index
+
+
+# Función para cargar el léxico de un diccionario de datos guardado por
+# TP_prueba3 (comprimido o no), junto con el número de archivos procesados
+def load_lexicon(data_dict_file):
+    loaded_dict = load_json(find_existing_file(data_dict_file))
+    lexicon = Lexicon()
+    lexicon.load_positions(loaded_dict['POSICIONES'], lowercase=True)
+    return lexicon, loaded_dict.get('num_files_processed', 0)
+
+
+# Función para cargar el índice guardado (None si no existe)
+def load_index(index_file, lexicon):
+    index_file = find_existing_file(index_file)
+    if not os.path.exists(index_file):
+        return None
+    return PositionalIndex.from_json(load_json(index_file), lexicon)
+
+
+# Función para guardar el índice
+def save_index(index, index_file, codec=None):
+    replace_json(index.to_json(), index_file, codec, compact=True)
+
+
+# Función para obtener el índice al día con el léxico: se parte del índice
+# guardado y solo se agregan las entradas nuevas; si el índice guardado va
+# más adelante que el diccionario (por ejemplo, se restauró un diccionario
+# anterior) se reconstruye desde cero
+def updated_index(index_file, lexicon, num_files_processed):
+    index = load_index(index_file, lexicon)
+    if index is None or index.last_entry > num_files_processed:
+        index = PositionalIndex()
+    index.update(lexicon)
+    return index
+
+
+# Función principal para consultar el índice
+def main():
+    codec = codec_for_file('indice.json')  # --codec=gzip, lzma o zstd
+    index_file = with_codec_extension('indice.json', codec)
+    data_dict_file = input(
+        "Ingrese la ruta del diccionario de datos (data_dict.json): "
+    ).strip() or 'data_dict.json'
+
+    # Las apariciones salen del diccionario; del índice guardado solo se
+    # cargan los n-gramas y se agregan las entradas que falten
+    lexicon, num_files_processed = load_lexicon(data_dict_file)
+    index = updated_index(index_file, lexicon, num_files_processed)
+    save_index(index, index_file, codec)
+    print(f"Índice con {index.last_entry} entradas guardado en {index_file}.")
+
+    for n in range(2, index.max_n + 1):
+        print(f"\nN-gramas de {n} lexemas más frecuentes:")
+        for ngram, count in index.most_common_ngrams(n, limit=10):
+            print(f"  {' '.join(ngram)}: {count}")
+
+    while True:
+        query = input(
+            "\nIngrese una secuencia de lexemas, o de tokens precedida de "
+            "'token:' (vacío para salir): ").strip()
+        if not query:
+            break
+        kind = 'lexeme'
+        if query.startswith('token:'):
+            kind = 'token'
+            items = query[len('token:'):].split()
+        else:
+            items = query.lower().split()
+        if not items:
+            continue
+        occurrences = index.sequence_occurrences(items, kind)
+        print(f"Apariciones: {len(occurrences)}")
+        print(', '.join(occurrences))
+        for entry_number, count in sorted(
+                index.sequence_frequencies(items, kind).items()):
+            print(f"  TXT{entry_number}: {count}")
+
+
+if __name__ == "__main__":
+    main()
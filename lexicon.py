@@ -0,0 +1,239 @@
+import sys
+from array import array
+from itertools import islice
+from bisect import bisect_left, bisect_right
+
+
+# Arreglos vacíos compartidos por los lexemas sin apariciones: las variantes
+# que no guardan posiciones no pagan dos arreglos por lexema
+NO_OCCURRENCES = ()
+
+
+# Lexema registrado bajo un token, con sus apariciones (número de entrada y
+# posición) guardadas en arreglos compactos en lugar de listas de cadenas.
+# Los arreglos se crean con la primera aparición
+class Lexeme:
+    __slots__ = ('text', 'token_id', 'entries', 'positions')
+
+    def __init__(self, text, token_id):
+        self.text = text
+        self.token_id = token_id
+        self.entries = NO_OCCURRENCES
+        self.positions = NO_OCCURRENCES
+
+    # Función para registrar una aparición del lexema
+    def add_occurrence(self, entry_number, position):
+        if self.entries is NO_OCCURRENCES:
+            self.entries = array('I')
+            self.positions = array('I')
+        self.entries.append(entry_number)
+        self.positions.append(position)
+
+    # Función para obtener el rango de apariciones de una entrada; las
+    # apariciones se registran en orden, así que entries está ordenado
+    def entry_range(self, entry_number):
+        return (bisect_left(self.entries, entry_number),
+                bisect_right(self.entries, entry_number))
+
+    # Función para obtener las apariciones en el formato 'TXTn-pos'
+    def occurrences(self, entry_number=None):
+        if entry_number is None:
+            start, end = 0, len(self.entries)
+        else:
+            start, end = self.entry_range(entry_number)
+        return self._format_occurrences(start, end)
+
+    # Función para obtener las apariciones hasta la entrada last_entry
+    def occurrences_until(self, last_entry):
+        return self._format_occurrences(
+            0, bisect_right(self.entries, last_entry))
+
+    def _format_occurrences(self, start, end):
+        return [
+            f'TXT{self.entries[index]}-{self.positions[index]}'
+            for index in range(start, end)
+        ]
+
+    # Función para saber si el lexema aparece en una entrada
+    def has_entry(self, entry_number):
+        start, end = self.entry_range(entry_number)
+        return start < end
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return f'Lexeme({self.text!r}, {self.token_id})'
+
+
+# Función para separar una posición 'TXTn-pos' en sus dos números
+def parse_occurrence(occurrence):
+    entry, position = occurrence[3:].split('-')
+    return int(entry), int(position)
+
+
+# Diccionario de datos compartido por los tokenizadores: tokens con
+# identificador entero, patrones opcionales y lexemas internados
+class Lexicon:
+    __slots__ = ('tokens', 'patterns', '_token_ids', '_by_token')
+
+    def __init__(self):
+        self.tokens = []  # Nombre de cada token, indexado por su id
+        self.patterns = []  # Patrón de cada token (None si no tiene)
+        self._token_ids = {}
+        self._by_token = []  # Por id de token: texto -> Lexeme
+
+    # Función para obtener el id de un token (None si no existe)
+    def token_id(self, token):
+        return self._token_ids.get(token)
+
+    # Función para registrar un token y devolver su id
+    def add_token(self, token, pattern=None):
+        token_id = self._token_ids.get(token)
+        if token_id is None:
+            token_id = len(self.tokens)
+            self._token_ids[token] = token_id
+            self.tokens.append(sys.intern(token))
+            self.patterns.append(pattern)
+            self._by_token.append({})
+        elif pattern is not None and self.patterns[token_id] is None:
+            self.patterns[token_id] = pattern
+        return token_id
+
+    # Función para obtener el patrón de un token
+    def pattern(self, token):
+        return self.patterns[self._token_ids[token]]
+
+    # Función para reemplazar el patrón de un token
+    def set_pattern(self, token, pattern):
+        self.patterns[self.add_token(token)] = pattern
+
+    # Función para buscar un lexema; si está en varios tokens se devuelve
+    # el del token registrado primero. Los tokens son pocos, así que se
+    # consulta cada uno en lugar de mantener otro diccionario por lexema
+    def lookup(self, text):
+        for lexemes in self._by_token:
+            lexeme = lexemes.get(text)
+            if lexeme is not None:
+                return lexeme
+        return None
+
+    # Función para buscar un lexema dentro de un token
+    def lookup_in(self, token, text):
+        token_id = self._token_ids.get(token)
+        if token_id is None:
+            return None
+        return self._by_token[token_id].get(text)
+
+    # Función para registrar un lexema bajo un token (si no estaba ya)
+    def add_lexeme(self, token, text):
+        token_id = self.add_token(token)
+        lexemes = self._by_token[token_id]
+        lexeme = lexemes.get(text)
+        if lexeme is None:
+            text = sys.intern(text)
+            lexeme = Lexeme(text, token_id)
+            lexemes[text] = lexeme
+        return lexeme
+
+    # Función para iterar los lexemas de un token en orden de inserción
+    def lexemes(self, token):
+        token_id = self._token_ids.get(token)
+        if token_id is None:
+            return iter(())
+        return iter(self._by_token[token_id].values())
+
+    # Función para contar los lexemas de un token
+    def count(self, token):
+        token_id = self._token_ids.get(token)
+        if token_id is None:
+            return 0
+        return len(self._by_token[token_id])
+
+    def __contains__(self, text):
+        return self.lookup(text) is not None
+
+    # Itera todos los lexemas, token por token
+    def __iter__(self):
+        for lexemes in self._by_token:
+            yield from lexemes.values()
+
+    def __len__(self):
+        return sum(len(lexemes) for lexemes in self._by_token)
+
+    # Función para agregar el contenido de un JSON con claves 'TOKEN',
+    # 'LEXEMAS' y opcionalmente 'PATRON' (TP_codigo, TP_prueba, TP_prueba2)
+    def load_token_lists(self, loaded_dict):
+        patterns = loaded_dict.get('PATRON')
+        for index, token in enumerate(loaded_dict['TOKEN']):
+            self.add_token(token, patterns[index] if patterns else None)
+            for text in loaded_dict['LEXEMAS'][token]:
+                self.add_lexeme(token, text)
+
+    # Función para convertir al formato 'TOKEN'/'LEXEMAS'; con
+    # lexemes_as_dict los lexemas se guardan como {lexema: true}
+    def to_token_lists(self, with_patterns=False, lexemes_as_dict=False):
+        result = {'TOKEN': list(self.tokens)}
+        if with_patterns:
+            result['PATRON'] = list(self.patterns)
+        if lexemes_as_dict:
+            result['LEXEMAS'] = {
+                token: {text: True for text in self._by_token[token_id]}
+                for token_id, token in enumerate(self.tokens)
+            }
+        else:
+            result['LEXEMAS'] = {
+                token: list(self._by_token[token_id])
+                for token_id, token in enumerate(self.tokens)
+            }
+        return result
+
+    # Función para agregar el contenido de 'POSICIONES' (TP_prueba3); si un
+    # lexema ya existía se reemplazan sus apariciones. Se ordenan por
+    # (entrada, posición), porque entry_range busca por bisección
+    def load_positions(self, positions_dict, lowercase=False):
+        for token, lexemes in positions_dict.items():
+            self.add_token(token)
+            for text, occurrences in lexemes.items():
+                lexeme = self.add_lexeme(token,
+                                         text.lower() if lowercase else text)
+                if not occurrences:
+                    lexeme.entries = lexeme.positions = NO_OCCURRENCES
+                    continue
+                pairs = sorted(map(parse_occurrence, occurrences))
+                lexeme.entries = array('I', [entry for entry, _ in pairs])
+                lexeme.positions = array(
+                    'I', [position for _, position in pairs])
+
+    # Función para convertir al formato 'POSICIONES'; con entry_number solo
+    # se incluyen los lexemas que aparecen en esa entrada
+    def to_positions(self, entry_number=None):
+        if entry_number is None:
+            return {
+                token: {
+                    text: lexeme.occurrences()
+                    for text, lexeme in self._by_token[token_id].items()
+                }
+                for token_id, token in enumerate(self.tokens)
+            }
+        return {
+            token: {
+                text: lexeme.occurrences(entry_number)
+                for text, lexeme in self._by_token[token_id].items()
+                if lexeme.has_entry(entry_number)
+            }
+            for token_id, token in enumerate(self.tokens)
+        }
+
+    # Función para convertir al formato 'POSICIONES' el léxico tal como
+    # estaba al terminar la entrada last_entry; lexeme_counts indica cuántos
+    # lexemas tenía entonces cada token, y los agregados después se omiten
+    def to_positions_until(self, last_entry, lexeme_counts):
+        return {
+            token: {
+                text: lexeme.occurrences_until(last_entry)
+                for text, lexeme in islice(
+                    self._by_token[self._token_ids[token]].items(), count)
+            }
+            for token, count in lexeme_counts.items()
+        }
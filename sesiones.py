@@ -0,0 +1,245 @@
+import io
+import os
+import sys
+import time
+import tempfile
+import importlib
+import tracemalloc
+from contextlib import chdir, redirect_stdout
+
+from compresion import (open_file, load_json, dump_json, find_existing_file,
+                        with_codec_extension, codec_for_file,
+                        strip_codec_option)
+
+# Variantes del tokenizador que se pueden grabar
+scripts = ['TP_codigo', 'TP_prueba', 'TP_prueba2', 'TP_prueba3']
+
+# Variantes que numeran las entradas y nombran la salida por su cuenta; en
+# las demás main usa siempre la entrada 1 y un único archivo de salida
+positional_scripts = {'TP_prueba3'}
+
+
+# Función para importar una variante con su diccionario de datos vacío
+def load_script(script):
+    if script not in scripts:
+        raise ValueError(f"Variante desconocida: {script}")
+    if script in sys.modules:
+        return importlib.reload(sys.modules[script])
+    return importlib.import_module(script)
+
+
+# Función para ejecutar la variante como lo hace main, una vez por archivo
+# de entrada, en el directorio indicado y con el codec grabado; answers
+# reemplaza a las preguntas al usuario y se devuelven todos los archivos
+# generados, ya descomprimidos
+def run_entries(session, directory, answers):
+    script = session['script']
+    codec = session.get('codec')
+    data_dict_file = with_codec_extension('data_dict.json', codec)
+    with chdir(directory):
+        if session['data_dict'] is not None:
+            dump_json(session['data_dict'], data_dict_file, codec)
+        if session.get('index') is not None:
+            dump_json(session['index'],
+                      with_codec_extension('indice.json', codec), codec,
+                      compact=True)
+        for run_number, entry in enumerate(session['inputs'], 1):
+            with open(entry['name'], 'w', encoding='utf-8') as file:
+                file.write(entry['text'])
+
+            # Cada archivo es una ejecución nueva, con el estado recargado
+            module = load_script(script)
+            module.prompt_for_token = answers.token
+            module.prompt_for_predefined = answers.predefined
+            module.prepare_data_dict(data_dict_file)
+            if script in positional_scripts:
+                module.process_input_file(entry['name'], data_dict_file,
+                                          codec)
+            else:
+                module.process_input_file(
+                    entry['name'], 1, data_dict_file,
+                    with_codec_extension(f'output{run_number}.txt', codec),
+                    codec)
+
+        input_names = {entry['name'] for entry in session['inputs']}
+        outputs = {}
+        for name in sorted(os.listdir('.')):
+            if name not in input_names:
+                with open_file(name, 'r') as file:
+                    outputs[name] = file.read()
+    return outputs
+
+
+# Respuestas grabadas de una sesión: se entregan en el mismo orden en que
+# se grabaron y se verifica que el programa pregunte lo mismo
+class RecordedAnswers:
+
+    def __init__(self, session):
+        self.tokens = iter(session['answers'])
+        self.predefined_answers = iter(session['predefined_answers'])
+
+    def token(self, lexeme):
+        recorded = next(self.tokens, None)
+        if recorded is None:
+            raise ValueError(f"No hay respuesta grabada para '{lexeme}'.")
+        if recorded[0] != lexeme:
+            raise ValueError(f"Se esperaba el lexema '{recorded[0]}' "
+                             f"y se obtuvo '{lexeme}'.")
+        return recorded[1]
+
+    def predefined(self):
+        recorded = next(self.predefined_answers, None)
+        if recorded is None:
+            raise ValueError("No hay respuesta grabada sobre los lexemas "
+                             "predefinidos.")
+        return recorded
+
+    # Función para verificar que se usaron todas las respuestas
+    def check_finished(self):
+        if (next(self.tokens, None) is not None
+                or next(self.predefined_answers, None) is not None):
+            raise ValueError("Sobraron respuestas grabadas.")
+
+
+# Respuestas de una sesión en grabación: se pregunta normalmente al usuario
+# y se guarda cada respuesta en la sesión
+class RecordingAnswers:
+
+    def __init__(self, session):
+        self.session = session
+
+    def token(self, lexeme):
+        token = self.prompt_for_token(lexeme)
+        self.session['answers'].append([lexeme, token])
+        return token
+
+    def predefined(self):
+        answer = self.prompt_for_predefined()
+        self.session['predefined_answers'].append(answer)
+        return answer
+
+
+# Función para cargar el estado inicial de un archivo, en la versión que
+# exista con o sin comprimir (None si no existe)
+def load_starting_file(file_path):
+    file_path = find_existing_file(file_path)
+    if not os.path.exists(file_path):
+        return None
+    return load_json(file_path)
+
+
+# Función para grabar una sesión interactiva: se pregunta normalmente por
+# cada lexema nuevo y se guardan las respuestas y los resultados. El codec
+# es el de la opción --codec o el del diccionario existente, como en main
+def record_session(script, input_files, session_file,
+                   data_dict_file='data_dict.json', index_file='indice.json'):
+    codec = codec_for_file(data_dict_file)
+    index = None
+    if script in positional_scripts:
+        index = load_starting_file(index_file)
+
+    session = {
+        'script': script,
+        'codec': codec,
+        'data_dict': load_starting_file(data_dict_file),
+        'index': index,
+        'inputs': [],
+        'answers': [],
+        'predefined_answers': []
+    }
+    for input_file in input_files:
+        with open(input_file, 'r', encoding='utf-8') as file:
+            session['inputs'].append({
+                'name': os.path.basename(input_file),
+                'text': file.read()
+            })
+
+    # Las preguntas originales de la variante, antes de reemplazarlas
+    module = load_script(script)
+    answers = RecordingAnswers(session)
+    answers.prompt_for_token = module.prompt_for_token
+    answers.prompt_for_predefined = module.prompt_for_predefined
+
+    # Se trabaja en un directorio temporal para no modificar los archivos
+    with tempfile.TemporaryDirectory() as directory:
+        session['outputs'] = run_entries(session, directory, answers)
+    dump_json(session, session_file)
+    print(f"Sesión grabada en {session_file} "
+          f"({len(session['answers'])} respuestas).")
+    return session
+
+
+# Función para reproducir una sesión sin interacción; devuelve los nombres
+# de los archivos que no coinciden con los grabados
+def replay_session(session):
+    answers = RecordedAnswers(session)
+    with tempfile.TemporaryDirectory() as directory:
+        with redirect_stdout(io.StringIO()):
+            outputs = run_entries(session, directory, answers)
+    answers.check_finished()
+    names = set(session['outputs']) | set(outputs)
+    return sorted(
+        name for name in names
+        if outputs.get(name) != session['outputs'].get(name))
+
+
+# Función para medir una sesión: tiempo de cada repetición y pico de
+# memoria (medido en una repetición aparte, porque tracemalloc la enlentece)
+def measure_session(session, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        mismatches = replay_session(session)
+        times.append(time.perf_counter() - start)
+        if mismatches:
+            return mismatches, times, None
+
+    tracemalloc.start()
+    try:
+        replay_session(session)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return [], times, peak_memory
+
+
+# Función principal: grabar o reproducir sesiones
+def main():
+    usage = ("Uso:\n"
+             "  python sesiones.py grabar <variante> <sesion.json> "
+             "<entrada>... [--codec=gzip|lzma|zstd]\n"
+             "  python sesiones.py reproducir <sesion.json>...")
+    args = strip_codec_option(sys.argv[1:])
+    if len(args) < 2:
+        print(usage)
+        return 2
+
+    if args[0] == 'grabar' and len(args) >= 4:
+        record_session(args[1], args[3:], args[2])
+        return 0
+
+    if args[0] == 'reproducir':
+        failed = False
+        for session_file in args[1:]:
+            try:
+                session = load_json(session_file)
+                mismatches, times, peak_memory = measure_session(session)
+            except (FileNotFoundError, ValueError) as e:
+                print(f"{session_file}: ERROR - {e}")
+                failed = True
+                continue
+            if mismatches:
+                print(f"{session_file}: DIFERENTE - {', '.join(mismatches)}")
+                failed = True
+                continue
+            print(f"{session_file}: OK - mejor {min(times) * 1000:.2f} ms, "
+                  f"promedio {sum(times) / len(times) * 1000:.2f} ms, "
+                  f"pico de memoria {peak_memory / 1024:.1f} KiB")
+        return 1 if failed else 0
+
+    print(usage)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+import random
+import unittest
+from array import array
+from bisect import bisect_left
+from itertools import combinations
+
+from lexicon import Lexicon
+from indice import PostingList, PositionalIndex, intersect, make_key
+
+
+# Función para armar una lista de apariciones a partir de sus claves
+def posting_list(keys):
+    return PostingList(array('Q', sorted(set(keys))))
+
+
+# Función para armar un léxico con varias entradas; cada entrada es una
+# lista de (lexema, token) en orden de posición
+def build_lexicon(entries):
+    lexicon = Lexicon()
+    for entry_number, sequence in enumerate(entries, 1):
+        for position, (text, token) in enumerate(sequence, 1):
+            lexicon.add_lexeme(token, text).add_occurrence(
+                entry_number, position)
+    return lexicon
+
+
+# Función para indexar un léxico desde cero
+def build_index(lexicon, max_n=3):
+    index = PositionalIndex(max_n)
+    index.update(lexicon)
+    return index
+
+
+ENTRIES = [
+    [('el', 'ART'), ('perro', 'SUS'), ('come', 'VER'), ('el', 'ART'),
+     ('hueso', 'SUS')],
+    [('el', 'ART'), ('perro', 'SUS'), ('el', 'ART'), ('perro', 'SUS'),
+     ('come', 'VER')],
+    [('come', 'VER'), ('el', 'ART'), ('perro', 'SUS'), ('come', 'VER')],
+]
+
+
+class PostingListTest(unittest.TestCase):
+
+    def test_advance_matches_bisect(self):
+        rng = random.Random(0)
+        for size in (0, 1, 2, 3, 10, 50, 200):
+            # Claves densas (muchas consecutivas) y dispersas
+            spread = rng.choice((2, 10))
+            postings = posting_list(
+                rng.randrange(size * spread + 1) for _ in range(size))
+            keys = list(postings.keys)
+            for _ in range(200):
+                start = rng.randrange(len(keys) + 1)
+                # Objetivos al azar y justo alrededor de claves existentes,
+                # donde un salto de más se saltearía la clave buscada
+                if keys and rng.random() < 0.5:
+                    target = rng.choice(keys) + rng.choice((-1, 0, 1))
+                else:
+                    target = rng.randrange(size * spread + 10)
+                expected = max(start, bisect_left(keys, target))
+                self.assertEqual(postings.advance(start, target), expected)
+
+    def test_append_rejects_out_of_order_keys(self):
+        postings = PostingList()
+        postings.append(5)
+        with self.assertRaises(ValueError):
+            postings.append(5)
+        with self.assertRaises(ValueError):
+            postings.append(3)
+
+    def test_intersect_matches_brute_force(self):
+        rng = random.Random(1)
+        for _ in range(100):
+            first = posting_list(
+                rng.randrange(300) for _ in range(rng.randrange(80)))
+            second = posting_list(
+                rng.randrange(300) for _ in range(rng.randrange(80)))
+            offset = rng.randrange(4)
+            second_keys = set(second.keys)
+            expected = [key for key in first.keys
+                        if key + offset in second_keys]
+            self.assertEqual(list(intersect(first, second, offset).keys),
+                             expected)
+
+
+class PositionalIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = build_index(build_lexicon(ENTRIES))
+
+    def test_sequence_occurrences(self):
+        self.assertEqual(self.index.sequence_occurrences(['el', 'perro']),
+                         ['TXT1-1', 'TXT2-1', 'TXT2-3', 'TXT3-2'])
+        self.assertEqual(
+            self.index.sequence_occurrences(['SUS', 'VER'], kind='token'),
+            ['TXT1-2', 'TXT2-4', 'TXT3-3'])
+        self.assertEqual(self.index.sequence_occurrences([]), [])
+        self.assertEqual(self.index.sequence_occurrences(['gato']), [])
+
+    def test_ngram_count(self):
+        self.assertEqual(self.index.ngram_count(['el', 'perro']), 4)
+        self.assertEqual(self.index.ngram_count(['el', 'perro', 'come']), 3)
+        self.assertEqual(
+            self.index.ngram_count(['ART', 'SUS', 'VER'], kind='token'), 3)
+        # Con n mayor que max_n se cuenta intersectando listas
+        self.assertEqual(
+            self.index.ngram_count(['el', 'perro', 'el', 'perro']), 1)
+        self.assertEqual(self.index.ngram_count(['perro', 'el']), 1)
+        self.assertEqual(self.index.ngram_count(['hueso', 'el']), 0)
+
+    def test_ngram_count_matches_sequence_postings(self):
+        for n in (2, 3):
+            for ngram, count in self.index.most_common_ngrams(n):
+                self.assertEqual(
+                    count, len(self.index.sequence_postings(list(ngram))))
+
+    def test_cooccurrence_count_matches_brute_force(self):
+        occurrences = [(entry_number, position, text)
+                       for entry_number, sequence in enumerate(ENTRIES, 1)
+                       for position, (text, _) in enumerate(sequence, 1)]
+        lexemes = {text for _, _, text in occurrences}
+        for window in (1, 2, 5):
+            for first in lexemes:
+                for second in lexemes:
+                    # Cada par de apariciones distintas se cuenta una vez
+                    expected = sum(
+                        1 for a, b in combinations(occurrences, 2)
+                        if a[0] == b[0] and abs(a[1] - b[1]) <= window
+                        and {a[2], b[2]} == {first, second})
+                    self.assertEqual(
+                        self.index.cooccurrence_count(first, second, window),
+                        expected, (first, second, window))
+
+    def test_cooccurrence_count_same_lexeme(self):
+        # 'el' aparece dos veces en TXT1 y TXT2 a distancia 3 y 2
+        self.assertEqual(self.index.cooccurrence_count('el', 'el', 3), 2)
+        self.assertEqual(self.index.cooccurrence_count('el', 'el', 2), 1)
+        self.assertEqual(self.index.cooccurrence_count('el', 'el', 1), 0)
+
+    def test_update_only_indexes_new_entries(self):
+        lexicon = build_lexicon(ENTRIES[:2])
+        index = build_index(lexicon)
+        for position, (text, token) in enumerate(ENTRIES[2], 1):
+            lexicon.add_lexeme(token, text).add_occurrence(3, position)
+        index.update(lexicon)
+        expected = build_index(lexicon)
+        self.assertEqual(index.last_entry, 3)
+        self.assertEqual(index.to_json(), expected.to_json())
+        self.assertEqual(index.lexeme_occurrences('come'),
+                         expected.lexeme_occurrences('come'))
+        with self.assertRaises(ValueError):
+            index.add_entry(3, [])
+
+    def test_json_round_trip_rebuilds_postings_from_lexicon(self):
+        lexicon = build_lexicon(ENTRIES)
+        loaded = PositionalIndex.from_json(self.index.to_json(), lexicon)
+        self.assertNotIn('lexemas', self.index.to_json())
+        self.assertEqual(loaded.last_entry, self.index.last_entry)
+        self.assertEqual(loaded.lexeme_ngrams, self.index.lexeme_ngrams)
+        self.assertEqual(loaded.token_ngrams, self.index.token_ngrams)
+        for postings, expected in (
+            (loaded.lexeme_postings, self.index.lexeme_postings),
+            (loaded.token_postings, self.index.token_postings)):
+            self.assertEqual(
+                {item: list(keys.keys) for item, keys in postings.items()},
+                {item: list(keys.keys) for item, keys in expected.items()})
+
+    def test_json_round_trip_leaves_newer_entries_for_update(self):
+        lexicon = build_lexicon(ENTRIES[:2])
+        saved = build_index(lexicon).to_json()
+        for position, (text, token) in enumerate(ENTRIES[2], 1):
+            lexicon.add_lexeme(token, text).add_occurrence(3, position)
+        loaded = PositionalIndex.from_json(saved, lexicon)
+        self.assertEqual(loaded.last_entry, 2)
+        self.assertNotIn(make_key(3, 1), loaded.postings('come').keys)
+        loaded.update(lexicon)
+        self.assertEqual(loaded.to_json(), build_index(lexicon).to_json())
+
+
+if __name__ == "__main__":
+    unittest.main()